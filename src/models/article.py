@@ -1,6 +1,6 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
-import json
+import orjson
 
 @dataclass
 class ArticleSection:
@@ -31,4 +31,6 @@ class Article:
     metadata: Dict[str, Any]
 
     def to_json(self) -> str:
-        return json.dumps(asdict(self), ensure_ascii=False)
+        # orjson serializes dataclasses natively, no asdict() deep copy needed.
+        # Output is compact ({"a":1}), not json.dumps' spaced {"a": 1}.
+        return orjson.dumps(self).decode()
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+import orjson
+
+@dataclass
+class Image:
+    image_id: str
+    modality: Optional[str]
+    plane: Optional[str]
+    filepath: str
+    caption: str
+    annotations: Dict[str, Any]
+
+@dataclass
+class Case:
+    source: str
+    source_id: str
+    title: str
+    body_system: str
+    body_part: Optional[str]
+    modality: List[str]
+    clinical_presentation: str
+    diagnosis: Dict[str, Any]
+    narrative: Dict[str, str]
+    images: List[Image]
+    tags: List[str]
+    metadata: Dict[str, Any]
+
+    def to_json(self) -> str:
+        # orjson serializes dataclasses natively, no asdict() deep copy needed.
+        # Output is compact ({"a":1}), not json.dumps' spaced {"a": 1}.
+        return orjson.dumps(self).decode()
@@ -0,0 +1,5 @@
+import sys
+import os
+
+# Add parent dir to path so we can import src
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,120 @@
+import os
+
+import orjson
+
+from src.ingestion.radiopaedia import _parse_article, _parse_case, _parse_html, _parse_patient
+from src.models.article import ArticleImage, ArticleSection
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+CASE_URL = "https://radiopaedia.org/cases/cystic-bronchiectasis-1"
+ARTICLE_URL = "https://radiopaedia.org/articles/cystic-bronchiectasis"
+
+
+def _fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def test_parse_case():
+    html = _fixture('case.html')
+    case = _parse_case(html, CASE_URL)
+
+    assert case.source == "radiopaedia"
+    assert case.source_id == "rID-8654"
+    assert case.title == "Cystic bronchiectasis"
+    assert case.body_system == "Chest"
+    assert case.tags == ["CT", "bronchiectasis"]
+    assert case.modality == ["CT"]
+    assert case.diagnosis == {"text": "Cystic bronchiectasis", "certainty": "Diagnosis certain"}
+    assert case.narrative == {
+        "findings": "Multiple thin-walled cysts up to 5 mm.",
+        "impression": "",
+        "discussion": "Classic appearance.",
+    }
+    # The <img> without a src is skipped but still counts towards the numbering
+    assert [(img.image_id, img.filepath) for img in case.images] == [
+        ("rID-8654_img_1", "https://example.org/1.jpg"),
+        ("rID-8654_img_3", "https://example.org/3.jpg"),
+    ]
+    assert case.metadata == {
+        "created_at": "2010-05-01T10:00:00Z",
+        "url": CASE_URL,
+        "license": "See Radiopaedia ToS",
+    }
+
+    data = orjson.loads(case.to_json())
+    assert data["source_id"] == "rID-8654"
+    assert data["images"][0] == {
+        "image_id": "rID-8654_img_1",
+        "modality": "Unknown",
+        "plane": "Unknown",
+        "filepath": "https://example.org/1.jpg",
+        "caption": "Image 1 from case",
+        "annotations": {},
+    }
+
+    assert _parse_patient(_parse_html(html)) == {
+        "age": 45,
+        "age_unit": "years",
+        "sex": "female",
+        "other": None,
+    }
+
+
+def test_parse_article():
+    article = _parse_article(_fixture('article.html'), ARTICLE_URL)
+
+    assert article.source == "radiopaedia"
+    assert article.source_id == "rID-12345"
+    assert article.type == "article"
+    assert article.title == "Cystic bronchiectasis"
+    assert article.body_system == "Chest"
+    assert article.tags == ["lungs", "airways"]
+    assert article.sections == [
+        ArticleSection(
+            slug="introduction",
+            title="Introduction",
+            markdown="Cystic bronchiectasis is the most severe form.",
+        ),
+        ArticleSection(
+            slug="pathology",
+            title="Pathology",
+            markdown="Airways dilate.\n- one nested\n- two\n- seen in cystic fibrosis, PCD and H2O see below",
+        ),
+        ArticleSection(
+            slug="radiographic_features",
+            title="Radiographic features",
+            markdown="Clustered ring shadows.",
+        ),
+    ]
+    # Non-dict inclusions are skipped; missing keys fall back to defaults
+    assert article.images == [
+        ArticleImage(
+            image_id="7",
+            figure_label=None,
+            modality="Unknown",
+            plane=None,
+            caption="Axial CT",
+            filepath="https://example.org/t.jpg",
+        ),
+        ArticleImage(
+            image_id="unknown",
+            figure_label=None,
+            modality="Unknown",
+            plane=None,
+            caption="No id",
+            filepath="",
+        ),
+    ]
+    assert article.metadata["url"] == ARTICLE_URL
+
+
+def test_parse_article_encoding_fallbacks():
+    # No header charset and no <meta charset>: decoded as UTF-8, not Latin-1
+    article = _parse_article(_fixture('article_no_charset.html'), ARTICLE_URL)
+    assert article.title == "Café – Mañana"
+    assert article.sections[0].markdown == "Wall thickness ≤ 5 mm."
+
+    # A declared charset libxml2 doesn't recognise falls back to <meta charset>
+    for encoding in ('x-bogus', 'utf_8', 'latin_1'):
+        assert _parse_article(_fixture('article.html'), ARTICLE_URL, encoding).title == "Cystic bronchiectasis"